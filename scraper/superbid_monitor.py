@@ -9,11 +9,251 @@ SUPERBID MONITOR - Match Garantido 100%
 
 import os
 import sys
+import gzip
+import json
 import time
+import atexit
+import random
+import logging
+import threading
 import requests
+from queue import SimpleQueue
+from logging.handlers import QueueHandler, QueueListener
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from functools import lru_cache, partial
 from typing import List, Dict, Optional, Set
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # opcional: cai para o json da stdlib
+
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None  # opcional: cai para o fromisoformat da stdlib
+
+
+# ============================================================================
+# LOGGING (hot path) - threads só enfileiram; um listener de fundo drena
+# para stderr. Prints continuam nos banners/estatísticas da thread principal
+# ============================================================================
+
+_log_queue = SimpleQueue()
+logger = logging.getLogger('superbid_monitor')
+logger.setLevel(os.getenv('MONITOR_LOG_LEVEL', 'INFO'))
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+# ============================================================================
+# JSON (orjson quando disponível - parse/dump ~5x mais rápido)
+# ============================================================================
+
+if orjson is not None:
+    def _json_loads(raw: bytes):
+        return orjson.loads(raw)
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+else:
+    def _json_loads(raw: bytes):
+        return json.loads(raw)
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+
+# Corpos acima disso vão comprimidos (snapshots de 500 itens passam de 1MB)
+_GZIP_MIN_BYTES = 16384
+
+
+def _maybe_gzip(body: bytes, headers: Dict):
+    """Comprime o corpo se valer a pena; retorna (corpo, headers).
+    Não muta os headers recebidos - eles são compartilhados entre chamadas"""
+    if len(body) >= _GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=5), {**headers, 'Content-Encoding': 'gzip'}
+    return body, headers
+
+
+# ============================================================================
+# HELPERS DE EXTRAÇÃO
+# ============================================================================
+# Definidos no módulo (e não dentro de _create_snapshot/_create_update) para
+# não recriar as mesmas funções a cada item processado.
+
+# Cache dos caminhos já divididos: os mesmos ~40 paths se repetem por item
+_PATH_CACHE: Dict[str, tuple] = {}
+
+
+def _deep_get(data: Dict, path: str, default=None):
+    """Navega caminho 'a.b.c' em dicts aninhados"""
+    keys = _PATH_CACHE.get(path)
+    if keys is None:
+        keys = _PATH_CACHE[path] = tuple(path.split('.'))
+
+    value = data
+    for key in keys:
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return default
+        if value is None:
+            return default
+    return value
+
+
+def _safe_int(val):
+    try:
+        return int(val) if val not in (None, '') else None
+    except:
+        return None
+
+
+def _safe_float(val):
+    try:
+        return float(val) if val not in (None, '') else None
+    except:
+        return None
+
+
+def _safe_bool(val):
+    if val is None:
+        return False
+    if isinstance(val, bool):
+        return val
+    return str(val).lower() in ('true', '1', 'yes', 'sim')
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(dt_str: str) -> Optional[datetime]:
+    """Parse ISO com cache: as datas de leilão se repetem entre ofertas
+    (um leilão agrupa dezenas de lotes com o mesmo begin/end).
+    Usa ciso8601 (parser em C, ~10x) quando instalado"""
+    try:
+        if ciso8601 is not None:
+            dt = ciso8601.parse_datetime(dt_str)
+        else:
+            dt = datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    except:
+        return None
+
+
+def _intern_str(val):
+    """Deduplica strings que se repetem em milhares de ofertas
+    (categoria, cidade, seller, loja...) - uma cópia em memória"""
+    if isinstance(val, str):
+        return sys.intern(val)
+    return val
+
+
+def _parse_datetime(val) -> Optional[datetime]:
+    """Converte valor do banco (str ISO ou datetime) em datetime com tz"""
+    if not val:
+        return None
+    if isinstance(val, str):
+        return _parse_iso(val)
+    try:
+        if val.tzinfo is None:
+            return val.replace(tzinfo=timezone.utc)
+        return val
+    except:
+        return None
+
+
+def _safe_state(val):
+    if not val:
+        return None
+    val_str = str(val).strip().upper()
+    if len(val_str) == 2 and val_str.isalpha():
+        return val_str
+    return None
+
+
+# ============================================================================
+# SCHEMA DO SNAPSHOT
+# ============================================================================
+# Campos copiados direto da API: (coluna, caminho, conversor, default se
+# None). Conversor None = valor cru. Os campos derivados (deltas,
+# velocidades, flags de mudança) continuam calculados em _create_snapshot.
+
+_SNAPSHOT_FIELDS = (
+    ('total_bids', 'totalBids', _safe_int, 0),
+    ('total_bidders', 'totalBidders', _safe_int, 0),
+    ('visits', 'visits', _safe_int, 0),
+    ('has_bids', 'hasBids', _safe_bool, False),
+    ('price', 'price', _safe_float, None),
+    ('initial_bid_value', 'initialBidValue', _safe_float, None),
+    ('current_min_bid', 'currentMinBid', _safe_float, None),
+    ('current_max_bid', 'currentMaxBid', _safe_float, None),
+    ('reserved_price', 'reservedPrice', _safe_float, None),
+    ('bid_increment', 'bidIncrement', _safe_float, None),
+    ('current_winner_id', 'currentWinner.id', _safe_int, None),
+    ('current_winner_login', 'currentWinner.login', None, None),
+    ('is_sold', 'isSold', _safe_bool, False),
+    ('is_reserved', 'isReserved', _safe_bool, False),
+    ('is_closed', 'isClosed', _safe_bool, False),
+    ('is_removed', 'isRemoved', _safe_bool, False),
+    ('is_highlight', 'isHighlight', _safe_bool, False),
+    # Datas do leilão ficam fora da tabela: _create_snapshot parseia uma vez
+    # para calcular os campos temporais e serializa uma vez para o payload
+    ('category', 'product.subCategory.category.description', _intern_str, None),
+    ('product_type_desc', 'product.productType.description', _intern_str, None),
+    ('sub_category_desc', 'product.subCategory.description', _intern_str, None),
+    ('auction_modality', 'auction.modalityDesc', _intern_str, None),
+    ('offer_type_id', 'offerTypeId', _safe_int, None),
+    ('city', 'product.location.city', _intern_str, None),
+    ('state', 'product.location.state', _safe_state, None),
+    ('location_lat', 'product.location.locationGeo.lat', _safe_float, None),
+    ('location_lon', 'product.location.locationGeo.lon', _safe_float, None),
+    ('seller_id', 'seller.id', _safe_int, None),
+    ('seller_name', 'seller.name', _intern_str, None),
+    ('store_id', 'store.id', _safe_int, None),
+    ('store_name', 'store.name', _intern_str, None),
+    ('manager_name', 'manager.name', _intern_str, None),
+    ('photo_count', 'product.photoCount', _safe_int, 0),
+    ('video_url_count', 'product.videoUrlCount', _safe_int, 0),
+    ('title', 'product.shortDesc', None, None),
+    ('description', 'product.detailedDescription', None, None),
+    ('commission_percent', 'groupOffer.commissionPercent', _safe_float, None),
+    ('allows_credit_card', 'commercialCondition.allowsCreditCard', _safe_bool, False),
+    ('transaction_limit', 'commercialCondition.transactionLimit', _safe_float, None),
+    ('max_installments', 'commercialCondition.maxInstallments', _safe_int, None),
+    ('total_received_proposals', 'totalReceivedProposals', _safe_int, 0),
+    ('has_received_bids_or_proposals', 'hasReceivedBidsOrProposals', _safe_bool, False),
+)
+
+
+# ============================================================================
+# RATE LIMITER
+# ============================================================================
+
+class RateLimiter:
+    """Limitador de taxa global (thread-safe) para a API do Superbid"""
+
+    def __init__(self, reqs_per_period: int = 30, period_in_secs: float = 1.0):
+        self.interval = period_in_secs / reqs_per_period
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def acquire(self):
+        """Bloqueia o tempo necessário para respeitar o limite global"""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
 
 # ============================================================================
 # SUPABASE CLIENT
@@ -32,6 +272,12 @@ class SupabaseSuperbidMonitor:
         self.url = self.url.rstrip('/')
         self.table_items = 'superbid_items'
         self.table_monitoring = 'superbid_monitoring'
+
+        # Endpoints montados uma vez (não refaz f-string por chamada)
+        self.items_url = f"{self.url}/rest/v1/{self.table_items}"
+        self.monitoring_url = f"{self.url}/rest/v1/{self.table_monitoring}"
+        self.snapshot_counts_url = f"{self.url}/rest/v1/superbid_snapshot_counts"
+        self.active_items_url = f"{self.url}/rest/v1/superbid_active_items"
         
         self.headers = {
             'apikey': self.key,
@@ -39,70 +285,90 @@ class SupabaseSuperbidMonitor:
             'Content-Type': 'application/json',
             'Content-Profile': 'auctions',
             'Accept-Profile': 'auctions',
+            # Explícito: páginas de 1000 itens encolhem ~10x na rede
+            'Accept-Encoding': 'gzip, deflate',
         }
         
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-    
-    def get_all_active_items(self) -> List[Dict]:
-        """Busca TODOS os itens ativos (sem limit) - PAGINADO"""
-        print(f"📊 Carregando itens do banco (TODOS)...")
-        
-        url = f"{self.url}/rest/v1/{self.table_items}"
-        
-        all_items = []
-        offset = 0
+
+        # Pool de conexões keep-alive dimensionado para os flushes em lote.
+        # Retry só em GET/HEAD e falhas de conexão: repetir um POST de
+        # snapshots após um 5xx tardio poderia duplicar linhas
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Variantes de headers pré-montadas (sem headers.copy() por chamada)
+        self.headers_count = {**self.headers, 'Prefer': 'count=exact'}
+        self.headers_minimal = {**self.headers, 'Prefer': 'return=minimal'}
+        self.headers_upsert = {**self.headers, 'Prefer': 'resolution=merge-duplicates,return=minimal'}
+
+    def iter_active_items(self):
+        """Busca TODOS os itens ativos - STREAMING, uma página por vez.
+        Quem consome indexa na hora; não acumula a tabela inteira aqui"""
+        print("📊 Carregando itens do banco (TODOS)...")
+
+        # Lê da view superbid_active_items (sql/superbid_active_items.sql):
+        # filtro e projeção ficam no servidor, com índice parcial dedicado
+        url = self.active_items_url
+
+        last_id = 0
+        page = 0
+        total = 0
         page_size = 1000
-        
+
+        # Parte fixa da query montada uma vez; só o filtro de id muda por
+        # página (keyset: id > último visto, custo constante no Postgres)
+        params = {
+            'select': '*',
+            'limit': page_size,
+            'order': 'id.asc',
+        }
+
         while True:
-            # Query simples - só campos que existem
-            params = {
-                'select': 'id,external_id,offer_id,category,total_bids,total_bidders,visits,has_bids,current_winner_id,is_sold,is_closed,is_active,last_scraped_at',
-                'is_active': 'eq.true',
-                'is_closed': 'eq.false',
-                'limit': page_size,
-                'offset': offset,
-                'order': 'id.asc',
-            }
-            
+            params['id'] = f'gt.{last_id}'
+
             try:
                 response = self.session.get(url, params=params, timeout=30)
-                
+
                 if response.status_code == 200:
-                    items = response.json()
-                    
+                    items = _json_loads(response.content)
+
                     if not items:
                         break
-                    
-                    all_items.extend(items)
-                    print(f"   📄 Página {offset//page_size + 1}: +{len(items)} itens (total: {len(all_items)})")
-                    
-                    if len(items) < page_size:
-                        break
-                    
-                    offset += page_size
-                    
+
+                    last_id = items[-1]['id']
+                    page += 1
+                    total += len(items)
+                    print(f"   📄 Página {page}: +{len(items)} itens (total: {total})")
+
+                    yield from items
+
                 else:
                     print(f"❌ Erro HTTP {response.status_code}")
                     break
-                    
+
             except Exception as e:
                 print(f"❌ Erro: {str(e)}")
                 break
-        
-        print(f"✅ {len(all_items)} itens carregados no total\n")
-        return all_items
+
+        print(f"✅ {total} itens carregados no total\n")
     
     def count_snapshots(self, item_id: int) -> int:
         """Conta snapshots de um item"""
-        url = f"{self.url}/rest/v1/{self.table_monitoring}"
+        url = self.monitoring_url
         
         try:
             params = {'item_id': f'eq.{item_id}', 'select': 'id'}
-            headers = self.headers.copy()
-            headers['Prefer'] = 'count=exact'
-            
-            response = self.session.get(url, params=params, headers=headers, timeout=10)
+
+            response = self.session.get(url, params=params, headers=self.headers_count, timeout=10)
             
             if response.status_code == 200:
                 content_range = response.headers.get('Content-Range', '0-0/0')
@@ -112,46 +378,83 @@ class SupabaseSuperbidMonitor:
         except:
             return 0
     
+    def get_snapshot_counts(self, item_ids: List[int]) -> Dict[int, int]:
+        """Busca contagem de snapshots de todos os itens de uma vez (via view)"""
+        url = self.snapshot_counts_url
+
+        counts = {}
+        chunk_size = 500  # ids por URL, para não estourar o limite de tamanho
+
+        for i in range(0, len(item_ids), chunk_size):
+            chunk = item_ids[i:i + chunk_size]
+            params = {
+                'select': 'item_id,snapshot_count',
+                'item_id': f"in.({','.join(str(item_id) for item_id in chunk)})",
+            }
+
+            try:
+                response = self.session.get(url, params=params, timeout=30)
+
+                if response.status_code == 200:
+                    for row in _json_loads(response.content):
+                        counts[row['item_id']] = row['snapshot_count']
+                else:
+                    print(f"   ⚠️  Contagens: HTTP {response.status_code}")
+            except Exception as e:
+                print(f"   ⚠️  Erro contagens: {str(e)[:80]}")
+
+        return counts
+
     def insert_snapshots_batch(self, snapshots: List[Dict]) -> int:
         """Insere snapshots em lote"""
-        url = f"{self.url}/rest/v1/{self.table_monitoring}"
+        url = self.monitoring_url
         
         try:
-            headers = self.headers.copy()
-            headers['Prefer'] = 'return=minimal'
-            
-            response = self.session.post(url, json=snapshots, headers=headers, timeout=60)
+            body, headers = _maybe_gzip(_json_dumps(snapshots), self.headers_minimal)
+            response = self.session.post(url, data=body, headers=headers, timeout=60)
             
             if response.status_code in (200, 201):
                 return len(snapshots)
             else:
                 error = response.text[:300]
-                print(f"   ❌ HTTP {response.status_code}: {error}")
+                logger.error(f"   ❌ HTTP {response.status_code}: {error}")
                 return 0
         except Exception as e:
-            print(f"   ❌ Erro: {str(e)[:100]}")
+            logger.error(f"   ❌ Erro: {str(e)[:100]}")
             return 0
     
     def update_base_items_batch(self, updates: List[Dict]) -> int:
-        """Atualiza itens em lote"""
-        count = 0
-        url = f"{self.url}/rest/v1/{self.table_items}"
-        
-        try:
-            for update in updates:
-                item_id = update.pop('id')
-                params = {'id': f'eq.{item_id}'}
-                headers = self.headers.copy()
-                headers['Prefer'] = 'return=minimal'
-                
-                response = self.session.patch(url, params=params, json=update, headers=headers, timeout=30)
-                
-                if response.status_code in (200, 204):
-                    count += 1
-        except Exception as e:
-            print(f"   ❌ Erro update: {str(e)[:80]}")
-        
-        return count
+        """Atualiza itens em lote - UM upsert só (antes era 1 PATCH por item).
+        Upsert é idempotente, então pode retentar 429/5xx com backoff + jitter
+        (o insert de snapshots NÃO pode: repetir duplicaria linhas)"""
+        url = self.items_url
+        params = {'on_conflict': 'id'}
+        body, headers = _maybe_gzip(_json_dumps(updates), self.headers_upsert)
+
+        max_attempts = 3
+
+        for attempt in range(max_attempts):
+            try:
+                response = self.session.post(url, params=params, data=body, headers=headers, timeout=60)
+
+                if response.status_code in (200, 201, 204):
+                    return len(updates)
+
+                if response.status_code in (429, 502, 503, 504) and attempt < max_attempts - 1:
+                    retry_after = _safe_float(response.headers.get('Retry-After'))
+                    wait = retry_after if retry_after else (2 ** attempt) + random.uniform(0, 1)
+                    logger.warning(f"   ⚠️  Upsert HTTP {response.status_code}, retry em {wait:.1f}s")
+                    time.sleep(wait)
+                    continue
+
+                error = response.text[:300]
+                logger.error(f"   ❌ Upsert HTTP {response.status_code}: {error}")
+                return 0
+            except Exception as e:
+                logger.error(f"   ❌ Erro update: {str(e)[:80]}")
+                return 0
+
+        return 0
     
     def __del__(self):
         if hasattr(self, 'session'):
@@ -197,6 +500,8 @@ class SuperbidMonitor:
             'items_matched': 0,
             'items_not_matched': 0,
             'snapshots_created': 0,
+            'snapshots_skipped': 0,
+            'snapshots_deferred': 0,
             'items_updated': 0,
             'bid_changes': 0,
             'status_changes': 0,
@@ -213,7 +518,30 @@ class SuperbidMonitor:
         
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-        
+
+        # Concorrência: várias categorias em paralelo, taxa global limitada
+        self.max_workers = int(os.getenv('MONITOR_WORKERS', '8'))
+        self.page_size = 100
+
+        # Polling adaptativo: item frio (só visitas mudando) espera esse
+        # intervalo mínimo entre snapshots; item quente grava sempre
+        self.cold_snapshot_hours = 6
+        self.ending_soon_hours = 24
+
+        # Pool keep-alive (uma conexão por worker) + retry com backoff
+        # exponencial; urllib3 respeita o Retry-After de 429/503 sozinho
+        retry = Retry(
+            total=3,
+            backoff_factor=1.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate_limiter = RateLimiter(reqs_per_period=30, period_in_secs=1.0)
+        self.stats_lock = threading.Lock()
+
         self.client = SupabaseSuperbidMonitor()
         self.db_items_by_offer_id = {}
     
@@ -225,29 +553,30 @@ class SuperbidMonitor:
         print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("="*80 + "\n")
         
-        start_time = time.time()
-        
-        # 1. Carrega TODOS os itens do banco (sem limit)
-        db_items = self.client.get_all_active_items()
-        
-        if not db_items:
-            print("⚠️  Nenhum item no banco")
-            return 0
+        start_time = time.monotonic()  # imune a ajustes de relógio/NTP
         
-        self.stats['items_in_db'] = len(db_items)
-        
-        # Indexa por offer_id E por categoria
+        # 1. Carrega TODOS os itens do banco (streaming) já indexando por
+        # offer_id E por categoria - sem lista intermediária da tabela toda
+        items_in_db = 0
         items_by_category = {}
-        for item in db_items:
+        for item in self.client.iter_active_items():
+            items_in_db += 1
             offer_id = item['offer_id']
             category = item.get('category', 'Desconhecida')  # ← MUDOU: era category_display
-            
+
+            # Converte last_scraped_at UMA vez na ingestão (não por snapshot)
+            item['last_scraped_at'] = _parse_datetime(item.get('last_scraped_at'))
+
             self.db_items_by_offer_id[offer_id] = item
-            
-            if category not in items_by_category:
-                items_by_category[category] = []
-            items_by_category[category].append(offer_id)
-        
+
+            items_by_category.setdefault(category, []).append(offer_id)
+
+        if not self.db_items_by_offer_id:
+            print("⚠️  Nenhum item no banco")
+            return 0
+
+        self.stats['items_in_db'] = items_in_db
+
         print(f"🎯 {len(self.db_items_by_offer_id)} offer_ids")
         print(f"📦 {len(items_by_category)} categorias no banco\n")
         print("="*80 + "\n")
@@ -260,8 +589,8 @@ class SuperbidMonitor:
             print("⚠️  Nenhuma oferta da API")
             return 0
         
-        self.stats['items_scraped'] = len(api_offers)
-        print(f"\n✅ {len(api_offers)} ofertas scrapadas\n{'='*80}\n")
+        # items_scraped vem de _fetch_all_categories (conta antes do filtro)
+        print(f"\n✅ {self.stats['items_scraped']} ofertas scrapadas ({len(api_offers)} monitoradas)\n{'='*80}\n")
         
         # 3. Processa matches
         print("🔄 Processando matches...")
@@ -270,7 +599,7 @@ class SuperbidMonitor:
         # 4. Stats
         self._print_stats()
         
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         minutes = int(elapsed // 60)
         seconds = int(elapsed % 60)
         
@@ -281,110 +610,141 @@ class SuperbidMonitor:
         return 0
     
     def _fetch_all_categories(self) -> Dict[int, Dict]:
-        """Scrape todas as categorias (IGUAL AO SCRAPER)"""
+        """Scrape em DUAS FASES: a 1ª página de cada categoria descobre o
+        total; depois todas as páginas restantes vão em paralelo, sem uma
+        categoria grande segurar as outras"""
         all_offers = {}
-        
-        for idx, (url_slug, display_name) in enumerate(self.categories, 1):
-            print(f"[{idx}/{len(self.categories)}] 📦 {display_name}")
-            
-            offers = self._scrape_category(url_slug)
-            
-            for offer_id, offer_data in offers.items():
-                all_offers[offer_id] = offer_data
-            
-            print(f"   ✅ {len(offers)} ofertas\n")
-            time.sleep(1)
-        
-        return all_offers
-    
-    def _scrape_category(self, url_slug: str) -> Dict[int, Dict]:
-        """Scrape completo de uma categoria"""
-        offers = {}
-        page_num = 1
-        page_size = 100
-        consecutive_errors = 0
-        max_errors = 3
-        
-        while True:
-            try:
-                params = {
-                    "urlSeo": f"{self.site_url}/categorias/{url_slug}",
-                    "locale": "pt_BR",
-                    "orderBy": "score:desc",
-                    "pageNumber": page_num,
-                    "pageSize": page_size,
-                    "portalId": "[2,15]",
-                    "requestOrigin": "marketplace",
-                    "searchType": "opened" if url_slug == 'imoveis' else "openedAll",
-                    "timeZoneId": "America/Sao_Paulo",
-                }
-                
-                response = self.session.get(self.api_url, params=params, timeout=30)
-                
-                if response.status_code != 200:
-                    consecutive_errors += 1
-                    print(f"   ⚠️  HTTP {response.status_code} pág {page_num}")
-                    if consecutive_errors >= max_errors:
-                        break
-                    page_num += 1
-                    time.sleep(3)
+        wanted = set(self.db_items_by_offer_id)  # só retém o que monitoramos
+        scraped = 0
+        remaining = []  # (url_slug, page_num) das páginas 2+
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Fase 1: primeira página de cada categoria
+            futures = {
+                executor.submit(self._fetch_page, url_slug, 1): (url_slug, display_name)
+                for url_slug, display_name in self.categories
+            }
+
+            for future in as_completed(futures):
+                url_slug, display_name = futures[future]
+                data = future.result()
+
+                if data is None:
+                    print(f"📦 {display_name}: falhou na 1ª página")
                     continue
-                
-                data = response.json()
-                api_offers = data.get('offers', [])
+
+                scraped += self._collect_offers(data, all_offers, wanted)
+
                 total = data.get('total', 0)
-                
-                if not api_offers:
-                    break
-                
-                consecutive_errors = 0
-                print(f"   📄 Pág {page_num}: {len(api_offers)} ofertas (total: {total})")
-                
-                for offer in api_offers:
-                    offer_id = offer.get('id')
-                    if offer_id:
-                        offers[offer_id] = offer
-                
-                # Verifica se há mais páginas
-                start = data.get('start', 0)
-                limit = data.get('limit', page_size)
-                if start + limit >= total:
-                    break
-                
-                page_num += 1
-                time.sleep(0.5)
-                
-            except Exception as e:
-                consecutive_errors += 1
+                limit = data.get('limit', self.page_size) or self.page_size
+                num_pages = (total + limit - 1) // limit
+
+                remaining.extend((url_slug, page) for page in range(2, num_pages + 1))
+                print(f"📦 {display_name}: {total} ofertas em {max(num_pages, 1)} páginas")
+
+            # Fase 2: todas as demais páginas, de todas as categorias
+            if remaining:
+                print(f"\n📄 Buscando {len(remaining)} páginas restantes...")
+
+                futures = {
+                    executor.submit(self._fetch_page, url_slug, page): url_slug
+                    for url_slug, page in remaining
+                }
+
+                for future in as_completed(futures):
+                    data = future.result()
+                    if data is not None:
+                        scraped += self._collect_offers(data, all_offers, wanted)
+
+        self.stats['items_scraped'] = scraped
+        return all_offers
+
+    def _fetch_page(self, url_slug: str, page_num: int) -> Optional[Dict]:
+        """Busca UMA página de uma categoria; retorna o JSON ou None"""
+        params = {
+            "urlSeo": f"{self.site_url}/categorias/{url_slug}",
+            "locale": "pt_BR",
+            "orderBy": "score:desc",
+            "pageNumber": page_num,
+            "pageSize": self.page_size,
+            "portalId": "[2,15]",
+            "requestOrigin": "marketplace",
+            "searchType": "opened" if url_slug == 'imoveis' else "openedAll",
+            "timeZoneId": "America/Sao_Paulo",
+        }
+
+        try:
+            self.rate_limiter.acquire()
+            response = self.session.get(self.api_url, params=params, timeout=30)
+
+            if response.status_code != 200:
+                # 429/5xx já passaram pelo Retry do adapter (backoff +
+                # Retry-After); chegar aqui é falha persistente ou 4xx
+                with self.stats_lock:
+                    self.stats['errors'] += 1
+                logger.warning(f"   ⚠️  {url_slug}: HTTP {response.status_code} pág {page_num}")
+                return None
+
+            return _json_loads(response.content)
+
+        except Exception as e:
+            with self.stats_lock:
                 self.stats['errors'] += 1
-                print(f"   ⚠️  Erro pág {page_num}: {str(e)[:60]}")
-                if consecutive_errors >= max_errors:
-                    break
-                page_num += 1
-                time.sleep(3)
-        
-        return offers
+            logger.warning(f"   ⚠️  {url_slug}: erro pág {page_num}: {str(e)[:60]}")
+            return None
+
+    @staticmethod
+    def _collect_offers(data: Dict, all_offers: Dict[int, Dict], wanted: Set[int]) -> int:
+        """Indexa as ofertas de uma página por id (na thread principal).
+        Só guarda ofertas monitoradas - o resto do marketplace é descartado
+        aqui, antes de ocupar memória até a fase de match"""
+        api_offers = data.get('offers', [])
+
+        for offer in api_offers:
+            offer_id = offer.get('id')
+            if offer_id and offer_id in wanted:
+                all_offers[offer_id] = offer
+
+        return len(api_offers)
     
     def _process_matches(self, api_offers: Dict[int, Dict]):
         """Processa matches"""
-        print(f"\n🔄 Processando matches...")
+        print("\n🔄 Processando matches...")
         print(f"   Total no banco: {len(self.db_items_by_offer_id)}")
         print(f"   Total da API: {len(api_offers)}")
         
+        # Contagem de snapshots em UMA query (antes eram N round-trips)
+        snapshot_counts = self.client.get_snapshot_counts(
+            [item['id'] for item in self.db_items_by_offer_id.values()]
+        )
+
+        # Timestamp único do ciclo (não um datetime.now() por item)
+        now = datetime.now(timezone.utc)
+        now_iso = now.isoformat()
+
         snapshots = []
         updates = []
-        batch_size = 50
-        
+        # Lotes grandes: menos round-trips ao Supabase (500-1000 é o doce)
+        batch_size = int(os.getenv('MONITOR_BATCH_SIZE', '500'))
+
         total = len(self.db_items_by_offer_id)
         processed = 0
-        
-        print(f"\n⏳ Iniciando loop de processamento...\n")
-        
+        # Guarda o isEnabledFor fora do loop: em INFO os logs por item nem
+        # formatam a mensagem (MONITOR_LOG_LEVEL=DEBUG liga)
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        print("\n⏳ Iniciando loop de processamento...\n")
+
+        # Flush em thread própria: o I/O do Supabase roda em paralelo com o
+        # processamento do próximo lote (no máximo um flush em voo)
+        flush_executor = ThreadPoolExecutor(max_workers=1)
+        pending_flush = None
+
         for offer_id, db_item in self.db_items_by_offer_id.items():
             processed += 1
             
-            # Progress SEMPRE a cada 50
-            if processed % 50 == 0:
+            # Progress a cada 500 (a cada 50 dominava o tempo do loop)
+            if processed % 500 == 0:
                 print(f"   [{processed}/{total}] 🔄 Processando... (matched: {self.stats['items_matched']}, snapshots: {len(snapshots)})")
             
             api_data = api_offers.get(offer_id)
@@ -394,396 +754,265 @@ class SuperbidMonitor:
                 continue
             
             self.stats['items_matched'] += 1
-            
-            # ⚠️ REMOVIDO: count_snapshots (tá travando aqui!)
-            # total_snaps = self.client.count_snapshots(db_item['id'])
-            total_snaps = 0  # Usa zero por enquanto
-            
-            # Cria snapshot
-            snapshot = self._create_snapshot(db_item, api_data, total_snaps)
+
+            total_snaps = snapshot_counts.get(db_item['id'], 0)
+
+            # Nada mudou e já existe baseline? Não grava snapshot repetido
+            if total_snaps > 0 and not self._has_changes(db_item, api_data):
+                self.stats['snapshots_skipped'] += 1
+                if debug:
+                    logger.debug(f"   ⏭️  {offer_id}: sem mudança, snapshot pulado")
+                continue
+
+            # Item frio (só deriva de visitas)? Respeita o intervalo mínimo
+            if total_snaps > 0 and not self._is_hot(db_item, api_data, now):
+                last_dt = db_item.get('last_scraped_at')
+                if last_dt and (now - last_dt).total_seconds() < self.cold_snapshot_hours * 3600:
+                    self.stats['snapshots_deferred'] += 1
+                    if debug:
+                        logger.debug(f"   ❄️  {offer_id}: item frio, snapshot adiado")
+                    continue
+
+            # Cria snapshot (o update sai dele, sem segunda extração)
+            snapshot = self._create_snapshot(db_item, api_data, total_snaps, now, now_iso)
             if snapshot:
                 snapshots.append(snapshot)
-                
+                updates.append(self._update_from_snapshot(db_item['id'], snapshot, now_iso))
+
                 if snapshot['bid_status_changed']:
                     self.stats['bid_changes'] += 1
                 if snapshot['status_changed']:
                     self.stats['status_changes'] += 1
             
-            # Cria update
-            update = self._create_update(db_item, api_data)
-            if update:
-                updates.append(update)
-            
-            # Flush em lotes
+            # Flush em lotes (assíncrono; espera o anterior terminar)
             if len(snapshots) >= batch_size:
-                print(f"   💾 Flush: {len(snapshots)} snapshots, {len(updates)} updates")
-                self._flush_batch(snapshots, updates)
+                logger.info(f"   💾 Flush: {len(snapshots)} snapshots, {len(updates)} updates")
+                if pending_flush is not None:
+                    pending_flush.result()
+                pending_flush = flush_executor.submit(self._flush_batch, snapshots, updates)
                 snapshots = []
                 updates = []
-        
+
         # Flush final
+        if pending_flush is not None:
+            pending_flush.result()
+
         if snapshots or updates:
             print(f"\n   💾 Flush final: {len(snapshots)} snapshots, {len(updates)} updates")
             self._flush_batch(snapshots, updates)
-        
+
+        flush_executor.shutdown()
+
         print(f"\n✅ {processed} itens processados!")
     
+    def _is_hot(self, db_item: Dict, api_data: Dict, now: datetime) -> bool:
+        """Item quente: tem/mudou lance, mudou status ou leilão perto do fim"""
+        get = partial(_deep_get, api_data)
+
+        if _safe_bool(get('hasBids')):
+            return True
+        if (_safe_int(get('totalBids')) or 0) != (db_item.get('total_bids', 0) or 0):
+            return True
+        if _safe_bool(get('isSold')) != (db_item.get('is_sold', False) or False):
+            return True
+        if _safe_bool(get('isClosed')) != (db_item.get('is_closed', False) or False):
+            return True
+
+        end_dt = _parse_datetime(get('auction.endDate'))
+        if end_dt and (end_dt - now).total_seconds() <= self.ending_soon_hours * 3600:
+            return True
+
+        return False
+
+    def _has_changes(self, db_item: Dict, api_data: Dict) -> bool:
+        """Compara os campos dinâmicos da API com o que já está no banco"""
+        get = partial(_deep_get, api_data)
+
+        return (
+            (_safe_int(get('totalBids')) or 0) != (db_item.get('total_bids', 0) or 0)
+            or (_safe_int(get('totalBidders')) or 0) != (db_item.get('total_bidders', 0) or 0)
+            or (_safe_int(get('visits')) or 0) != (db_item.get('visits', 0) or 0)
+            or _safe_bool(get('hasBids')) != (db_item.get('has_bids', False) or False)
+            or _safe_int(get('currentWinner.id')) != db_item.get('current_winner_id')
+            or _safe_bool(get('isSold')) != (db_item.get('is_sold', False) or False)
+            or _safe_bool(get('isClosed')) != (db_item.get('is_closed', False) or False)
+        )
+
     def _flush_batch(self, snapshots: List[Dict], updates: List[Dict]):
-        """Salva lote de snapshots e updates"""
+        """Salva lote de snapshots e updates (pode rodar fora da thread
+        principal - stats protegidos pelo lock)"""
         if snapshots:
             inserted = self.client.insert_snapshots_batch(snapshots)
-            self.stats['snapshots_created'] += inserted
-        
+            with self.stats_lock:
+                self.stats['snapshots_created'] += inserted
+
         if updates:
             updated = self.client.update_base_items_batch(updates)
-            self.stats['items_updated'] += updated
+            with self.stats_lock:
+                self.stats['items_updated'] += updated
     
-    def _create_snapshot(self, db_item: Dict, api_data: Dict, total_snaps: int) -> Optional[Dict]:
-        """Cria snapshot - CÓDIGO IGUAL AO ANTERIOR"""
+    def _create_snapshot(self, db_item: Dict, api_data: Dict, total_snaps: int,
+                         now: datetime, now_iso: str) -> Optional[Dict]:
+        """Cria snapshot: campos diretos via _SNAPSHOT_FIELDS + derivados"""
         try:
-            now = datetime.now(timezone.utc)
-            
-            # HELPERS
-            def get(path: str, default=None):
-                keys = path.split('.')
-                value = api_data
-                for key in keys:
-                    if isinstance(value, dict):
-                        value = value.get(key)
-                    else:
-                        return default
-                    if value is None:
-                        return default
-                return value
-            
-            def safe_int(val):
-                try:
-                    return int(val) if val not in (None, '') else None
-                except:
-                    return None
-            
-            def safe_float(val):
-                try:
-                    return float(val) if val not in (None, '') else None
-                except:
-                    return None
-            
-            def safe_bool(val):
-                if val is None:
-                    return False
-                if isinstance(val, bool):
-                    return val
-                return str(val).lower() in ('true', '1', 'yes', 'sim')
-            
-            def safe_datetime(val):
-                if not val:
-                    return None
-                try:
-                    dt_str = str(val).replace('Z', '+00:00')
-                    dt = datetime.fromisoformat(dt_str)
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=timezone.utc)
-                    return dt.isoformat()
-                except:
-                    return None
-            
-            def safe_state(val):
-                if not val:
-                    return None
-                val_str = str(val).strip().upper()
-                if len(val_str) == 2 and val_str.isalpha():
-                    return val_str
-                return None
-            
-            # EXTRAÇÃO
-            total_bids = safe_int(get('totalBids')) or 0
-            total_bidders = safe_int(get('totalBidders')) or 0
-            visits = safe_int(get('visits')) or 0
-            has_bids = safe_bool(get('hasBids'))
-            
-            price = safe_float(get('price'))
-            initial_bid_value = safe_float(get('initialBidValue'))
-            current_min_bid = safe_float(get('currentMinBid'))
-            current_max_bid = safe_float(get('currentMaxBid'))
-            reserved_price = safe_float(get('reservedPrice'))
-            bid_increment = safe_float(get('bidIncrement'))
-            
-            current_winner_id = safe_int(get('currentWinner.id'))
-            current_winner_login = get('currentWinner.login')
-            
-            is_sold = safe_bool(get('isSold'))
-            is_reserved = safe_bool(get('isReserved'))
-            is_closed = safe_bool(get('isClosed'))
-            is_removed = safe_bool(get('isRemoved'))
-            is_highlight = safe_bool(get('isHighlight'))
-            
-            auction_begin_date = safe_datetime(get('auction.beginDate'))
-            auction_end_date = safe_datetime(get('auction.endDate'))
-            auction_max_enddate = safe_datetime(get('auction.maxEnddateOffer'))
-            
-            category = get('product.subCategory.category.description')
-            product_type_desc = get('product.productType.description')
-            sub_category_desc = get('product.subCategory.description')
-            auction_modality = get('auction.modalityDesc')
-            offer_type_id = safe_int(get('offerTypeId'))
-            
-            city = get('product.location.city')
-            state = safe_state(get('product.location.state'))
-            location_lat = safe_float(get('product.location.locationGeo.lat'))
-            location_lon = safe_float(get('product.location.locationGeo.lon'))
-            
-            seller_id = safe_int(get('seller.id'))
-            seller_name = get('seller.name')
-            store_id = safe_int(get('store.id'))
-            store_name = get('store.name')
-            manager_name = get('manager.name')
-            
-            photo_count = safe_int(get('product.photoCount')) or 0
-            video_url_count = safe_int(get('product.videoUrlCount')) or 0
-            
-            title = get('product.shortDesc')
-            description = get('product.detailedDescription')
-            
-            commission_percent = safe_float(get('groupOffer.commissionPercent'))
-            allows_credit_card = safe_bool(get('commercialCondition.allowsCreditCard'))
-            transaction_limit = safe_float(get('commercialCondition.transactionLimit'))
-            max_installments = safe_int(get('commercialCondition.maxInstallments'))
-            
-            total_received_proposals = safe_int(get('totalReceivedProposals')) or 0
-            has_received_bids_or_proposals = safe_bool(get('hasReceivedBidsOrProposals'))
-            
+            snap = {
+                'item_id': db_item['id'],
+                'external_id': db_item['external_id'],
+                'snapshot_at': now_iso,
+            }
+
+            # EXTRAÇÃO (dirigida pela tabela)
+            for column, path, conv, default in _SNAPSHOT_FIELDS:
+                value = _deep_get(api_data, path)
+                if conv is not None:
+                    value = conv(value)
+                snap[column] = default if value is None else value
+
+            has_bids = snap['has_bids']
+            is_sold = snap['is_sold']
+            is_closed = snap['is_closed']
+
+            # DATAS DO LEILÃO: parse uma vez, ISO só na serialização
+            begin_dt = _parse_datetime(_deep_get(api_data, 'auction.beginDate'))
+            end_dt = _parse_datetime(_deep_get(api_data, 'auction.endDate'))
+            max_end_dt = _parse_datetime(_deep_get(api_data, 'auction.maxEnddateOffer'))
+
+            snap['auction_begin_date'] = begin_dt.isoformat() if begin_dt else None
+            snap['auction_end_date'] = end_dt.isoformat() if end_dt else None
+            snap['auction_max_enddate'] = max_end_dt.isoformat() if max_end_dt else None
+
             # TEMPORAIS
             hours_until_auction_end = None
             hours_since_auction_start = None
             days_in_auction = None
-            
-            if auction_end_date:
-                try:
-                    end_dt = datetime.fromisoformat(auction_end_date)
-                    delta = (end_dt - now).total_seconds() / 3600
-                    hours_until_auction_end = round(delta, 2)
-                except:
-                    pass
-            
-            if auction_begin_date:
-                try:
-                    begin_dt = datetime.fromisoformat(auction_begin_date)
-                    delta = (now - begin_dt).total_seconds() / 3600
-                    hours_since_auction_start = round(delta, 2)
-                    days_in_auction = round(delta / 24, 2)
-                except:
-                    pass
-            
+
+            if end_dt:
+                hours_until_auction_end = round((end_dt - now).total_seconds() / 3600, 2)
+
+            if begin_dt:
+                delta = (now - begin_dt).total_seconds() / 3600
+                hours_since_auction_start = round(delta, 2)
+                days_in_auction = round(delta / 24, 2)
+
             # INCREMENTOS
-            old_total_bids = db_item.get('total_bids', 0) or 0
-            bid_count_change = total_bids - old_total_bids
-            
-            old_total_bidders = db_item.get('total_bidders', 0) or 0
-            bidder_count_change = total_bidders - old_total_bidders
-            
-            old_visits = db_item.get('visits', 0) or 0
-            visit_increment = visits - old_visits
-            
-            # TEMPO DESDE ÚLTIMO SNAPSHOT
-            old_last_scraped = db_item.get('last_scraped_at')
+            bid_count_change = snap['total_bids'] - (db_item.get('total_bids', 0) or 0)
+            bidder_count_change = snap['total_bidders'] - (db_item.get('total_bidders', 0) or 0)
+            visit_increment = snap['visits'] - (db_item.get('visits', 0) or 0)
+
+            # TEMPO DESDE ÚLTIMO SNAPSHOT (last_scraped_at já vem parseado)
+            old_dt = db_item.get('last_scraped_at')
             hours_since_last_snapshot = None
-            
-            if old_last_scraped:
-                try:
-                    if isinstance(old_last_scraped, str):
-                        old_dt = datetime.fromisoformat(str(old_last_scraped).replace('Z', '+00:00'))
-                    else:
-                        old_dt = old_last_scraped
-                    
-                    if old_dt.tzinfo is None:
-                        old_dt = old_dt.replace(tzinfo=timezone.utc)
-                    
-                    delta = (now - old_dt).total_seconds() / 3600
-                    hours_since_last_snapshot = round(delta, 2)
-                except:
-                    pass
-            
+
+            if old_dt:
+                hours_since_last_snapshot = round((now - old_dt).total_seconds() / 3600, 2)
+
             # VELOCIDADES
             bid_velocity = None
             visit_velocity = None
             popularity_velocity = None
-            
+
             if hours_since_last_snapshot and hours_since_last_snapshot > 0:
                 if bid_count_change > 0:
                     bid_velocity = round(bid_count_change / hours_since_last_snapshot, 4)
                 if visit_increment > 0:
                     visit_velocity = round(visit_increment / hours_since_last_snapshot, 4)
                     popularity_velocity = visit_velocity
-            
+
             # INCREMENTOS DE VALOR
+            initial_bid_value = snap['initial_bid_value']
+            current_max_bid = snap['current_max_bid']
+            bid_increment = snap['bid_increment']
+
             bid_total_increment = None
             bid_total_increment_percentage = None
             if current_max_bid and initial_bid_value and initial_bid_value > 0:
                 bid_total_increment = current_max_bid - initial_bid_value
                 bid_total_increment_percentage = round((bid_total_increment / initial_bid_value) * 100, 2)
-            
+
             bid_increment_percentage = None
             if bid_increment and initial_bid_value and initial_bid_value > 0:
                 bid_increment_percentage = round((bid_increment / initial_bid_value) * 100, 2)
-            
+
             # MUDANÇAS
-            old_has_bids = db_item.get('has_bids', False) or False
-            bid_status_changed = (has_bids != old_has_bids)
-            
-            old_is_closed = db_item.get('is_closed', False) or False
-            old_is_sold = db_item.get('is_sold', False) or False
-            status_changed = ((is_closed != old_is_closed) or (is_sold != old_is_sold))
-            
-            old_winner_id = db_item.get('current_winner_id')
-            winner_changed = (current_winner_id != old_winner_id) and current_winner_id is not None
-            
+            bid_status_changed = (has_bids != (db_item.get('has_bids', False) or False))
+
+            status_changed = (
+                (is_closed != (db_item.get('is_closed', False) or False))
+                or (is_sold != (db_item.get('is_sold', False) or False))
+            )
+
+            winner_changed = (
+                snap['current_winner_id'] is not None
+                and snap['current_winner_id'] != db_item.get('current_winner_id')
+            )
+
             time_with_bid_hours = None
             if has_bids and hours_since_auction_start:
                 time_with_bid_hours = hours_since_auction_start
-            
-            # SNAPSHOT COMPLETO
-            return {
-                'item_id': db_item['id'],
-                'external_id': db_item['external_id'],
-                'snapshot_at': now.isoformat(),
+
+            # DERIVADOS
+            snap.update({
                 'hours_until_auction_end': hours_until_auction_end,
                 'hours_since_auction_start': hours_since_auction_start,
                 'days_in_auction': days_in_auction,
-                'auction_begin_date': auction_begin_date,
-                'auction_end_date': auction_end_date,
-                'auction_max_enddate': auction_max_enddate,
-                'price': price,
-                'initial_bid_value': initial_bid_value,
-                'current_min_bid': current_min_bid,
-                'current_max_bid': current_max_bid,
-                'reserved_price': reserved_price,
-                'bid_increment': bid_increment,
                 'bid_total_increment': bid_total_increment,
                 'bid_total_increment_percentage': bid_total_increment_percentage,
                 'bid_increment_percentage': bid_increment_percentage,
-                'total_bids': total_bids,
-                'total_bidders': total_bidders,
-                'total_received_proposals': total_received_proposals,
-                'visits': visits,
                 'bid_count_change': bid_count_change,
                 'bidder_count_change': bidder_count_change,
                 'visit_increment': visit_increment,
                 'visit_velocity': visit_velocity,
                 'bid_velocity': bid_velocity,
                 'popularity_velocity': popularity_velocity,
-                'has_bids': has_bids,
-                'has_received_bids_or_proposals': has_received_bids_or_proposals,
-                'is_sold': is_sold,
-                'is_reserved': is_reserved,
-                'is_closed': is_closed,
-                'is_removed': is_removed,
-                'is_highlight': is_highlight,
                 'is_active': not is_closed and not is_sold,
                 'bid_status_changed': bid_status_changed,
                 'status_changed': status_changed,
                 'offer_status_changed': status_changed,
                 'winner_changed': winner_changed,
                 'time_with_bid_hours': time_with_bid_hours,
-                'current_winner_id': current_winner_id,
-                'current_winner_login': current_winner_login,
-                'category': category,
-                'product_type_desc': product_type_desc,
-                'sub_category_desc': sub_category_desc,
-                'auction_modality': auction_modality,
-                'offer_type_id': offer_type_id,
-                'city': city,
-                'state': state,
-                'location_lat': location_lat,
-                'location_lon': location_lon,
-                'seller_id': seller_id,
-                'seller_name': seller_name,
-                'store_id': store_id,
-                'store_name': store_name,
-                'manager_name': manager_name,
-                'photo_count': photo_count,
-                'video_url_count': video_url_count,
-                'title': title,
-                'description': description,
-                'commission_percent': commission_percent,
-                'allows_credit_card': allows_credit_card,
-                'transaction_limit': transaction_limit,
-                'max_installments': max_installments,
                 'hours_since_last_snapshot': hours_since_last_snapshot,
                 'total_snapshots_count': total_snaps + 1,
                 'source': 'superbid',
                 'metadata': {},
-            }
-            
-        except Exception as e:
-            print(f"   ❌ Erro snapshot: {str(e)[:100]}")
-            self.stats['errors'] += 1
-            return None
-    
-    def _create_update(self, db_item: Dict, api_data: Dict) -> Optional[Dict]:
-        """Cria update"""
-        try:
-            def get(path: str, default=None):
-                keys = path.split('.')
-                value = api_data
-                for key in keys:
-                    if isinstance(value, dict):
-                        value = value.get(key)
-                    else:
-                        return default
-                    if value is None:
-                        return default
-                return value
-            
-            def safe_int(val):
-                try:
-                    return int(val) if val not in (None, '') else None
-                except:
-                    return None
-            
-            def safe_float(val):
-                try:
-                    return float(val) if val not in (None, '') else None
-                except:
-                    return None
-            
-            def safe_bool(val):
-                if val is None:
-                    return False
-                if isinstance(val, bool):
-                    return val
-                return str(val).lower() in ('true', '1', 'yes', 'sim')
-            
-            return {
-                'id': db_item['id'],
-                'total_bids': safe_int(get('totalBids')) or 0,
-                'total_bidders': safe_int(get('totalBidders')) or 0,
-                'visits': safe_int(get('visits')) or 0,
-                'has_bids': safe_bool(get('hasBids')),
-                'current_max_bid': safe_float(get('currentMaxBid')),
-                'current_winner_id': safe_int(get('currentWinner.id')),
-                'current_winner_login': get('currentWinner.login'),
-                'is_sold': safe_bool(get('isSold')),
-                'is_closed': safe_bool(get('isClosed')),
-                'is_reserved': safe_bool(get('isReserved')),
-                'is_active': not safe_bool(get('isClosed')) and not safe_bool(get('isSold')),
-                'last_scraped_at': datetime.now(timezone.utc).isoformat(),
-            }
-            
+            })
+
+            return snap
+
         except Exception as e:
-            print(f"   ❌ Erro update: {str(e)[:80]}")
+            logger.error(f"   ❌ Erro snapshot: {str(e)[:100]}")
             self.stats['errors'] += 1
             return None
-    
+
+    @staticmethod
+    def _update_from_snapshot(item_id: int, snapshot: Dict, now_iso: str) -> Dict:
+        """Monta o update do item a partir do snapshot já extraído
+        (antes era uma segunda passada completa no JSON da API)"""
+        return {
+            'id': item_id,
+            'total_bids': snapshot['total_bids'],
+            'total_bidders': snapshot['total_bidders'],
+            'visits': snapshot['visits'],
+            'has_bids': snapshot['has_bids'],
+            'current_max_bid': snapshot['current_max_bid'],
+            'current_winner_id': snapshot['current_winner_id'],
+            'current_winner_login': snapshot['current_winner_login'],
+            'is_sold': snapshot['is_sold'],
+            'is_closed': snapshot['is_closed'],
+            'is_reserved': snapshot['is_reserved'],
+            'is_active': snapshot['is_active'],
+            'last_scraped_at': now_iso,
+        }
+
     def _print_stats(self):
         """Estatísticas"""
         print("\n" + "="*80)
         print("📊 ESTATÍSTICAS FINAIS")
         print("="*80)
-        print(f"\n📦 Banco:")
+        print("\n📦 Banco:")
         print(f"   • Total de itens: {self.stats['items_in_db']}")
-        print(f"\n🔍 Scraping:")
+        print("\n🔍 Scraping:")
         print(f"   • Ofertas scrapadas: {self.stats['items_scraped']}")
-        print(f"\n🎯 Matching:")
+        print("\n🎯 Matching:")
         print(f"   • Matched: {self.stats['items_matched']}")
         print(f"   • Não encontrados: {self.stats['items_not_matched']}")
         
@@ -791,11 +1020,13 @@ class SuperbidMonitor:
             match_percent = (self.stats['items_matched'] / self.stats['items_in_db']) * 100
             print(f"   • Taxa de match: {match_percent:.1f}%")
         
-        print(f"\n💾 Snapshots:")
+        print("\n💾 Snapshots:")
         print(f"   • Criados: {self.stats['snapshots_created']}")
+        print(f"   • Pulados (sem mudança): {self.stats['snapshots_skipped']}")
+        print(f"   • Adiados (item frio): {self.stats['snapshots_deferred']}")
         print(f"   • Itens atualizados: {self.stats['items_updated']}")
         
-        print(f"\n📈 Mudanças:")
+        print("\n📈 Mudanças:")
         print(f"   • Novos lances: {self.stats['bid_changes']}")
         print(f"   • Mudanças de status: {self.stats['status_changes']}")
         
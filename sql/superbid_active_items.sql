@@ -0,0 +1,27 @@
+-- View de apoio do monitor: itens ativos já filtrados e projetados no
+-- servidor. O monitor pagina por keyset em cima dela; com índice parcial,
+-- o Postgres nem visita os itens encerrados.
+
+create or replace view auctions.superbid_active_items as
+select
+    id,
+    external_id,
+    offer_id,
+    category,
+    total_bids,
+    total_bidders,
+    visits,
+    has_bids,
+    current_winner_id,
+    is_sold,
+    is_closed,
+    is_active,
+    last_scraped_at
+from auctions.superbid_items
+where is_active
+  and not is_closed;
+
+-- Índice parcial que atende a view + keyset (id > x order by id)
+create index if not exists superbid_items_active_id_idx
+    on auctions.superbid_items (id)
+    where is_active and not is_closed;
@@ -0,0 +1,9 @@
+-- View de apoio do monitor: contagem de snapshots por item em uma única query.
+-- Substitui o count_snapshots item a item (N round-trips ao PostgREST).
+
+create or replace view auctions.superbid_snapshot_counts as
+select
+    item_id,
+    count(*) as snapshot_count
+from auctions.superbid_monitoring
+group by item_id;